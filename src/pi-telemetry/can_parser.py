@@ -1,12 +1,77 @@
 import logging
 import struct
-import time
+from collections import namedtuple
 
+from can import CanError
 from can.typechecking import CanFilter
 
 # Define constants
 CAN_MASK_STANDARD = 0x7FF
 
+# Constants for conversions
+LITERS_TO_GALLONS = 0.264172  # 1 Liter = 0.264172 US Gallons
+
+# Raw temperatures are in 0.1 K units
+_TEMP_SCALE = 0.1
+_KELVIN = 273.15
+
+# Raw fuel level is in 0.1 L units; fold the scale and unit conversion into one factor
+_FUEL_RAW_TO_GALLONS = 0.1 * LITERS_TO_GALLONS
+
+# Latest parsed telemetry values, in CSV column order
+Telemetry = namedtuple(
+    "Telemetry", ["coolant_temp_celsius", "oil_temp_celsius", "fuel_level_gallons", "abs_error", "check_engine"]
+)
+
+# Positions of each value in the parser state, matching the Telemetry fields
+_COOLANT_TEMP_CELSIUS, _OIL_TEMP_CELSIUS, _FUEL_LEVEL_GALLONS, _ABS_ERROR, _CHECK_ENGINE = range(len(Telemetry._fields))
+
+# Precompiled struct for big-endian unsigned 16-bit words
+_U16BE = struct.Struct(">H")
+_unpack_u16be = _U16BE.unpack_from
+
+# Coolant (bytes 0-1) and oil (bytes 6-7) temperature words in a single read
+_TEMPERATURE_FRAME = struct.Struct(">H4xH")
+_unpack_temperature_frame = _TEMPERATURE_FRAME.unpack_from
+
+
+def _build_decoders(state):
+    """
+    Build a straight-line decoder for each handled arbitration ID.
+
+    Each decoder writes its values directly into the given state list,
+    with no logging or attribute lookups on the per-frame path.
+
+    Args:
+        state: List to store the decoded values in, indexed like Telemetry
+
+    Returns:
+        Dictionary mapping arbitration IDs to decoder functions taking a message
+    """
+
+    def decode_temperature(msg):
+        # Bytes 0-1 are coolant temperature and bytes 6-7 are oil temperature
+        coolant_raw, oil_raw = _unpack_temperature_frame(msg.data)
+        state[_COOLANT_TEMP_CELSIUS] = coolant_raw * _TEMP_SCALE - _KELVIN
+        state[_OIL_TEMP_CELSIUS] = oil_raw * _TEMP_SCALE - _KELVIN
+
+    def decode_fuel_level(msg):
+        # Bytes 0-1 are fuel level in 0.1 L units
+        state[_FUEL_LEVEL_GALLONS] = _unpack_u16be(msg.data, 0)[0] * _FUEL_RAW_TO_GALLONS
+
+    def decode_error(msg):
+        # Bit 0 of byte 7 is ABS Error and bit 1 is Check Engine Light
+        status = msg.data[7]
+        state[_ABS_ERROR] = (status & 0b10000000) != 0
+        state[_CHECK_ENGINE] = (status & 0b01000000) != 0
+
+    return {
+        0x3E0: decode_temperature,
+        0x3E2: decode_fuel_level,
+        0x3E4: decode_error,
+    }
+
+
 # CAN filter definitions - using proper CanFilter objects
 CAN_FILTERS = [
     CanFilter(can_id=0x372, can_mask=CAN_MASK_STANDARD),  # Battery voltage
@@ -23,53 +88,79 @@ class CANParser:
     ABS error, and check engine light.
     """
 
-    def __init__(self, can_interface, logger=None):
+    __slots__ = (
+        "can_interface",
+        "logger",
+        "reader",
+        "notifier",
+        "LITERS_TO_GALLONS",
+        "_recv",
+        "_state",
+        "_decoders",
+    )
+
+    def __init__(self, can_interface, logger=None, reader=None, notifier=None):
         """
         Initialize the CANParser with a CAN interface and logger.
 
         Args:
             can_interface: The CAN bus interface to receive messages from
             logger: Logger instance for logging messages (optional)
+            reader: A can.BufferedReader fed by a can.Notifier to receive messages
+                from instead of calling recv on the interface directly (optional)
+            notifier: The can.Notifier feeding the reader, checked for a failed receive thread (optional)
         """
         self.can_interface = can_interface
         self.logger = logger or logging.getLogger(__name__)
+        self.reader = reader
+        self.notifier = notifier
+
+        # Receive from the reader's buffer if one is given, otherwise from the interface
+        self._recv = reader.get_message if reader is not None else can_interface.recv
 
         # Constants for conversions
-        self.LITERS_TO_GALLONS = 0.264172  # 1 Liter = 0.264172 US Gallons
+        self.LITERS_TO_GALLONS = LITERS_TO_GALLONS
 
-        # Variables to store the parsed values
-        self.coolant_temp_celsius = None
-        self.oil_temp_celsius = None
-        self.fuel_level_gallons = None
-        self.abs_error = None
-        self.check_engine = None
+        # The latest parsed values, updated in place as messages arrive
+        self._state = [None] * len(Telemetry._fields)
 
-    def parse_messages(self, timeout=10.0, print_messages=False):
+        # Decoders keyed by arbitration ID
+        self._decoders = _build_decoders(self._state)
+
+    def parse_messages(self, timeout=10.0, print_messages=False, max_batch=256):
         """
         Main method to continuously parse CAN messages.
 
+        Blocks until a message arrives, then drains any further messages
+        already queued on the interface before returning, so callers see one
+        set of values per burst rather than per frame.
+
         Args:
             timeout: Timeout in seconds for receiving messages
             print_messages: If true, logs all current values at info
+            max_batch: Maximum number of messages to process per call
 
         Returns:
-            Dictionary containing the latest parsed values
+            Telemetry containing the latest parsed values
         """
         try:
-            msg = self.can_interface.recv(timeout)
+            self._check_notifier()
+
+            msg = self._recv(timeout)
             if msg is None:
+                # The reader also times out when the notifier thread has died
+                self._check_notifier()
                 self.logger.error("Timeout occurred, no message received")
                 return self.get_current_values()
 
-            self.logger.debug(f"Received message ID: 0x{msg.arbitration_id:X}")
+            self._process_message(msg)
 
-            # Process message based on arbitration ID
-            if msg.arbitration_id == 0x3E0:
-                self._process_temperature_message(msg)
-            elif msg.arbitration_id == 0x3E2:
-                self._process_fuel_level_message(msg)
-            elif msg.arbitration_id == 0x3E4:
-                self._process_error_message(msg)
+            # Drain messages that are already waiting without blocking
+            for _ in range(max_batch - 1):
+                msg = self._recv(0)
+                if msg is None:
+                    break
+                self._process_message(msg)
 
             # Optionally display all current values
             if print_messages:
@@ -77,87 +168,94 @@ class CANParser:
 
             return self.get_current_values()
 
+        except CanError:
+            # Leave retrying bus errors to the caller
+            raise
         except Exception as e:
             self.logger.error(f"Unexpected error: {e}")
-            time.sleep(1)  # Prevent tight error loop
             return self.get_current_values()
 
-    def _process_temperature_message(self, msg):
-        """Process coolant and oil temperature message (ID: 0x3E0)"""
-        try:
-            # Extract two bytes for coolant temperature
-            self.coolant_temp_celsius = (struct.unpack(">H", msg.data[0:2])[0] / 10.0) - 273.15
-            self.logger.debug(f"Coolant Temperature: {self.coolant_temp_celsius:.2f}°C")
+    def _check_notifier(self):
+        """Raise a CanError if the notifier's receive thread stopped because of an exception"""
+        if self.notifier is None or self.notifier.exception is None:
+            return
 
-            # Extract two bytes for oil temperature
-            self.oil_temp_celsius = (struct.unpack(">H", msg.data[6:8])[0] / 10.0) - 273.15
+        exc = self.notifier.exception
+        if isinstance(exc, CanError):
+            raise exc
+        raise CanError(f"CAN notifier stopped: {exc}") from exc
 
-            self.logger.debug(f"Oil Temperature: {self.oil_temp_celsius:.2f}°C")
-        except Exception as e:
-            self.logger.error(f"Error processing coolant & oil temperature: {e}")
+    @property
+    def coolant_temp_celsius(self):
+        """Latest coolant temperature in °C, or None if not received"""
+        return self._state[_COOLANT_TEMP_CELSIUS]
 
-    def _process_fuel_level_message(self, msg):
-        """Process fuel level message (ID: 0x3E2)"""
-        try:
-            # Extract bytes 0-1 for fuel level in liters
-            fuel_level_liters = struct.unpack(">H", msg.data[0:2])[0] / 10.0
-            self.fuel_level_gallons = fuel_level_liters * self.LITERS_TO_GALLONS
+    @property
+    def oil_temp_celsius(self):
+        """Latest oil temperature in °C, or None if not received"""
+        return self._state[_OIL_TEMP_CELSIUS]
 
-            self.logger.debug(f"Fuel Level: {self.fuel_level_gallons:.2f} gallons")
-        except Exception as e:
-            self.logger.error(f"Error processing fuel level: {e}")
+    @property
+    def fuel_level_gallons(self):
+        """Latest fuel level in US gallons, or None if not received"""
+        return self._state[_FUEL_LEVEL_GALLONS]
 
-    def _process_error_message(self, msg):
-        """Process ABS Error and Check Engine Light message (ID: 0x3E4)"""
-        try:
-            # Extract bit 0 for ABS Error
-            self.abs_error = bool((msg.data[7] & 0b10000000) >> 7)
+    @property
+    def abs_error(self):
+        """Latest ABS error flag, or None if not received"""
+        return self._state[_ABS_ERROR]
 
-            # Extract bit 1 for Check Engine Light
-            self.check_engine = bool((msg.data[7] & 0b01000000) >> 6)
+    @property
+    def check_engine(self):
+        """Latest check engine light flag, or None if not received"""
+        return self._state[_CHECK_ENGINE]
 
-            self.logger.debug(f"ABS Error: {self.abs_error}")
-            self.logger.debug(f"Check Engine Light: {self.check_engine}")
-        except Exception as e:
-            self.logger.error(f"Error processing ABS/Check Engine status: {e}")
+    def _process_message(self, msg):
+        """Process a single message based on its arbitration ID"""
+        self.logger.debug("Received message ID: 0x%X", msg.arbitration_id)
+
+        decoder = self._decoders.get(msg.arbitration_id)
+        if decoder is None:
+            return
+
+        # All handled messages are fixed 8-byte frames; drop anything shorter
+        if len(msg.data) < 8:
+            self.logger.warning("Dropping short frame (ID: 0x%X, length: %d)", msg.arbitration_id, len(msg.data))
+            return
+
+        decoder(msg)
+
+        # Checked per message so raising the log level to debug at runtime takes effect
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Decoded message ID 0x%X: %s", msg.arbitration_id, self.get_current_values())
 
     def _log_current_values(self):
         """Log all current values"""
-        self.logger.info("\nCurrent Values:")
-        self.logger.info(
-            f"Coolant Temperature: {self.coolant_temp_celsius:.2f}°C"
-            if self.coolant_temp_celsius is not None
-            else "Coolant Temperature: Not received"
-        )
-        self.logger.info(
-            f"Oil Temperature: {self.oil_temp_celsius:.2f}°C"
-            if self.oil_temp_celsius is not None
-            else "Oil Temperature: Not received"
-        )
-        self.logger.info(
-            f"Fuel Level: {self.fuel_level_gallons:.2f} gallons"
-            if self.fuel_level_gallons is not None
-            else "Fuel Level: Not received"
-        )
-        self.logger.info(f"ABS Error: {self.abs_error}" if self.abs_error is not None else "ABS Error: Not received")
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
         self.logger.info(
-            f"Check Engine Light: {self.check_engine}"
-            if self.check_engine is not None
-            else "Check Engine Light: Not received"
+            "\nCurrent Values:\n"
+            "Coolant Temperature: %s\n"
+            "Oil Temperature: %s\n"
+            "Fuel Level: %s\n"
+            "ABS Error: %s\n"
+            "Check Engine Light: %s\n"
+            "%s",
+            f"{self.coolant_temp_celsius:.2f}°C" if self.coolant_temp_celsius is not None else "Not received",
+            f"{self.oil_temp_celsius:.2f}°C" if self.oil_temp_celsius is not None else "Not received",
+            f"{self.fuel_level_gallons:.2f} gallons" if self.fuel_level_gallons is not None else "Not received",
+            self.abs_error if self.abs_error is not None else "Not received",
+            self.check_engine if self.check_engine is not None else "Not received",
+            "-" * 50,
         )
-        self.logger.info("-" * 50)
 
     def get_current_values(self):
         """
         Get the current parsed values.
 
         Returns:
-            Dictionary containing all the parsed values
+            Telemetry containing all the parsed values. This is an immutable snapshot,
+            so it is safe to hand to another thread.
         """
-        return {
-            "coolant_temp_celsius": self.coolant_temp_celsius,
-            "oil_temp_celsius": self.oil_temp_celsius,
-            "fuel_level_gallons": self.fuel_level_gallons,
-            "abs_error": self.abs_error,
-            "check_engine": self.check_engine,
-        }
+        return Telemetry._make(self._state)
@@ -1,68 +1,205 @@
-import csv
 import logging
 import os
-import tempfile
+import threading
+import time
+
+# Flush file data without forcing an inode metadata flush, where the platform supports it
+_fdatasync = getattr(os, "fdatasync", os.fsync)
 
 
 class CSVWriter:
     """
     Class for atomically writing telemetry data to a CSV file.
     The file will be overwritten each time data is written and will only contain one line.
+
+    Writes happen on a background thread so callers never wait on disk I/O.
+    Call close() when finished to write any remaining values and stop the thread.
     """
 
-    def __init__(self, filename, logger=None):
+    def __init__(self, filename, logger=None, batch_n=1, batch_ms=0, cpus=None):
         """
-        Initialize the CSVWriter with a filename and logger.
+        Initialize the CSVWriter with a filename and logger, and start the writer thread.
+
+        Values passed to write_values are held in memory and written to disk once
+        batch_n changed rows have been received or batch_ms milliseconds have passed
+        since the last write, whichever comes first. A batch_ms of 0 disables the time
+        limit, so only batch_n applies. The defaults write every change.
 
         Args:
             filename: The path to the CSV file to write to
             logger: Logger instance for logging messages (optional)
+            batch_n: Number of changed rows to hold before writing (optional)
+            batch_ms: Maximum time in milliseconds to hold a changed row before writing,
+                or 0 for no time limit (optional)
+            cpus: Set of CPU numbers to pin the writer thread to (optional)
         """
         self.filename = filename
         self.logger = logger or logging.getLogger(__name__)
+        self.batch_n = batch_n
+        self.batch_ms = batch_ms
+        self.cpus = cpus
+
+        # Fixed hidden temporary file in the target's directory, written and then renamed over it.
+        # The directory is resolved once here rather than on every write.
+        directory = os.path.dirname(os.path.abspath(filename))
+        self._temp_filename = os.path.join(directory, f".{os.path.basename(filename)}.tmp")
+
+        # Field names of the values being written and the encoded header line built from them
+        self._fieldnames = None
+        self._header = None
+
+        # The last row successfully written, used to skip rewriting unchanged values
+        self._last_row = None
+
+        # The newest row not yet written, how many changed rows it has replaced,
+        # and when a write was last attempted
+        self._pending = None
+        self._n_since_sync = 0
+        self._last_sync = float("-inf")
+
+        # The newest values handed from write_values to the writer thread, replaced by each call
+        # so memory stays bounded however long a write takes, and whether close() has been called
+        self._slot = None
+        self._stopping = False
+        self._ready = threading.Condition(threading.Lock())
+        self._thread = threading.Thread(target=self._writer_loop, name="csv-writer", daemon=True)
+        self._thread.start()
 
     def write_values(self, values):
         """
-        Atomically write the values dictionary to a CSV file.
+        Hand the values over to be atomically written to the CSV file, subject to batching.
         The file will be overwritten each time and will only contain one line.
+        Nothing is written if the formatted values match the last write.
+        Returns immediately; values not yet picked up by the writer thread are replaced,
+        so only the newest values are written.
 
         Args:
-            values: Dictionary containing the values to write
+            values: Named tuple (such as a Telemetry) containing the values to write,
+                whose field names are used as the header
+
+        Raises:
+            RuntimeError: If the writer thread is no longer running
         """
-        try:
-            # Create a temporary file in the same directory as the target file
-            directory = os.path.dirname(self.filename)
-            with tempfile.NamedTemporaryFile(mode="w", delete=False, dir=directory) as temp_file:
-                # Get the field names from the values dictionary
-                fieldnames = list(values.keys())
+        if not self._thread.is_alive():
+            raise RuntimeError("CSV writer thread is not running")
+
+        with self._ready:
+            self._slot = values
+            self._ready.notify()
+
+    def close(self, timeout=5.0):
+        """
+        Write any values still held back by batching and stop the writer thread.
 
-                # Create a CSV writer
-                writer = csv.DictWriter(temp_file, fieldnames=fieldnames)
+        Args:
+            timeout: Maximum time in seconds to wait for the writer thread to finish
+        """
+        with self._ready:
+            self._stopping = True
+            self._ready.notify()
 
-                # Write the header and the values
-                writer.writeheader()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.logger.warning("CSV writer thread did not stop, latest values may not be written")
 
-                # Format float values to two decimal places before writing
-                formatted_values = {k: (f"{v:.2f}" if isinstance(v, float) else v) for k, v in values.items()}
-                writer.writerow(formatted_values)
+    def _writer_loop(self):
+        """Write handed over values until close() is called"""
+        if self.cpus is not None:
+            try:
+                os.sched_setaffinity(0, self.cpus)
+            except (AttributeError, OSError) as e:
+                self.logger.warning(f"Failed to pin CSV writer thread to CPUs {sorted(self.cpus)}: {e}")
 
-                # Ensure all data is written to disk
-                temp_file.flush()
-                os.fsync(temp_file.fileno())
+        while True:
+            with self._ready:
+                ready = self._ready.wait_for(lambda: self._slot is not None or self._stopping, self._flush_timeout())
+                latest, self._slot = self._slot, None
+                stop = self._stopping
+
+            if not ready:
+                # The batch window closed without new values, so write what is held back
+                self._flush()
+                continue
 
-                # Get the temporary filename
-                temp_filename = temp_file.name
+            if latest is not None:
+                # Keep the thread running on bad values so later writes still happen
+                try:
+                    self._write(latest)
+                except Exception as e:
+                    self.logger.error(f"Error writing telemetry data to CSV: {e}")
+
+            if stop:
+                self._flush()
+                return
+
+    def _flush_timeout(self):
+        """Seconds until held back values are due to be written, or None to wait for new values"""
+        if self._pending is None or self.batch_ms <= 0:
+            return None
+
+        return max(self.batch_ms / 1000 - (time.monotonic() - self._last_sync), 0)
+
+    def _write(self, values):
+        """Format the values and write them if they changed and the batch is due"""
+        # The schema is fixed in practice, so only rebuild the header when the fields change
+        if values._fields is not self._fieldnames:
+            self._fieldnames = values._fields
+            self._header = (",".join(self._fieldnames) + "\r\n").encode()
+            self._last_row = None
+
+        # Format float values to two decimal places and missing values as empty fields,
+        # straight to bytes so the row needs no encoding when it is written
+        row = b",".join([b"%.2f" % v if type(v) is float else b"" if v is None else str(v).encode() for v in values])
+
+        # The file already holds these values, so avoid another write and fsync
+        if row == self._last_row:
+            self._pending = None
+            return
+
+        self._pending = row
+        self._n_since_sync += 1
+
+        if self._n_since_sync >= self.batch_n:
+            self._flush()
+        elif self.batch_ms > 0 and (time.monotonic() - self._last_sync) * 1000 >= self.batch_ms:
+            self._flush()
+
+    def _flush(self):
+        """Atomically write any values held back by batching to the CSV file"""
+        if self._pending is None:
+            return
+
+        row = self._pending
+        self._last_sync = time.monotonic()
+
+        try:
+            # Header and row with CSV (excel dialect) line endings; no field needs quoting
+            parts = (self._header, row, b"\r\n")
+
+            # Write to a temporary file in the same directory as the target file,
+            # gathering the parts in one syscall rather than concatenating them
+            fd = os.open(self._temp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                if os.writev(fd, parts) != sum(map(len, parts)):
+                    raise OSError(f"Short write to {self._temp_filename}")
+
+                # Ensure all data is written to disk
+                _fdatasync(fd)
+            finally:
+                os.close(fd)
 
             # Atomically replace the target file with the temporary file
-            os.replace(temp_filename, self.filename)
+            os.replace(self._temp_filename, self.filename)
+            self._last_row = row
+            self._pending = None
+            self._n_since_sync = 0
 
             self.logger.debug(f"Successfully wrote telemetry data to {self.filename}")
 
         except Exception as e:
             self.logger.error(f"Error writing telemetry data to CSV: {e}")
             # If the temporary file still exists, remove it
-            if "temp_filename" in locals():
-                try:
-                    os.remove(temp_filename)
-                except:
-                    pass
+            try:
+                os.remove(self._temp_filename)
+            except OSError:
+                pass
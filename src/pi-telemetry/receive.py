@@ -1,4 +1,6 @@
 import logging
+import os
+import socket
 import sys
 import time
 
@@ -15,37 +17,109 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Socket receive buffer size, large enough to absorb bursts while the CPU is busy elsewhere.
+# Without CAP_NET_ADMIN the kernel caps this at net.core.rmem_max.
+CAN_RCVBUF_SIZE = 1 << 20
+
+# Linux option to set the receive buffer size past net.core.rmem_max, which the socket module doesn't export
+SO_RCVBUFFORCE = getattr(socket, "SO_RCVBUFFORCE", 33)
+
+# Hold changed values for up to this many rows or milliseconds between CSV writes
+CSV_BATCH_N = 100
+CSV_BATCH_MS = 1000
+
+# Backoff between retries when CAN errors repeat, starting at the base and doubling per
+# consecutive error up to the maximum
+CAN_ERROR_BACKOFF_S = 0.05
+CAN_ERROR_BACKOFF_MAX_S = 1.0
+
+# Exit with an error after this many consecutive CAN errors so a supervisor can restart the program
+CAN_MAX_CONSECUTIVE_ERRORS = 10
+
+# Keep CAN reception and parsing on one core and CSV writing on another (the Pi Zero 2W has four)
+PARSER_CPUS = {2}
+WRITER_CPUS = {3}
+
+# Real-time SCHED_FIFO priority for CAN reception and parsing (needs CAP_SYS_NICE), or None to disable
+PARSER_SCHED_PRIORITY = 10
+
+
+def pin_current_thread(cpus, sched_priority=None):
+    """
+    Pin the calling thread to the given CPUs and optionally run it under SCHED_FIFO.
+    Threads started from it afterwards inherit both settings.
+    Failures are logged and otherwise ignored, since both depend on the hardware and privileges.
+
+    Args:
+        cpus: Set of CPU numbers the thread may run on
+        sched_priority: SCHED_FIFO priority to use, or None to keep the default scheduler (optional)
+    """
+    try:
+        os.sched_setaffinity(0, cpus)
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Failed to pin thread to CPUs {sorted(cpus)}: {e}")
+
+    if sched_priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(sched_priority))
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Failed to set SCHED_FIFO priority {sched_priority}: {e}")
+
+
 # Initialize CAN interface
 try:
     logger.info("Initializing CAN interface...")
-    can0 = can.interface.Bus(channel="can0", interface="socketcan")
+    # Filters passed here are installed in the kernel before any frames are received
+    can0 = can.interface.Bus(channel="can0", interface="socketcan", can_filters=CAN_FILTERS, receive_own_messages=False)
     logger.info("CAN interface initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize CAN interface: {e}")
     sys.exit(1)
 
 try:
-    if can0 is None:
-        raise ValueError("CAN interface not initialized")
+    try:
+        can0.socket.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, CAN_RCVBUF_SIZE)
+    except PermissionError:
+        # Not privileged, so fall back to the size capped at net.core.rmem_max
+        can0.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, CAN_RCVBUF_SIZE)
 
-    can0.set_filters(CAN_FILTERS)
+    # The kernel reports double the size set, to allow for bookkeeping overhead
+    rcvbuf_size = can0.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    if rcvbuf_size < CAN_RCVBUF_SIZE:
+        logger.warning(
+            f"CAN socket receive buffer is {rcvbuf_size} bytes, less than the {CAN_RCVBUF_SIZE} requested. "
+            "Run as root or raise net.core.rmem_max to allow a larger buffer."
+        )
+    else:
+        logger.info("CAN socket receive buffer set up successfully")
+except (AttributeError, OSError) as e:
+    logger.warning(f"Failed to set CAN socket receive buffer size: {e}")
 
-    logger.info("CAN filters set up successfully")
-
-except (AttributeError, ValueError, RuntimeError) as e:
-    logger.error(f"Failed to set up CAN filters: {e}")
-    sys.exit(1)
+notifier = None
+csv_writer = None
 
 try:
     logger.info("Waiting for CAN messages...")
 
-    # Create an instance of the CANParser
-    parser = CANParser(can_interface=can0, logger=logger)
+    # Create an instance of the CSVWriter, which writes from a background thread on its own
+    # CPU so slow disk I/O doesn't stall CAN reception. This is created before the main thread
+    # switches to SCHED_FIFO so the writer thread doesn't inherit it.
+    csv_writer = CSVWriter(
+        filename="telemetry_data.csv", logger=logger, batch_n=CSV_BATCH_N, batch_ms=CSV_BATCH_MS, cpus=WRITER_CPUS
+    )
 
-    # Create an instance of the CSVWriter
-    csv_writer = CSVWriter(filename="telemetry_data.csv", logger=logger)
+    # Pin this thread, and the notifier thread started next, to the parser CPU
+    pin_current_thread(PARSER_CPUS, PARSER_SCHED_PRIORITY)
+
+    # Receive frames on python-can's notifier thread and buffer them for the parser
+    reader = can.BufferedReader()
+    notifier = can.Notifier(can0, [reader])
+
+    # Create an instance of the CANParser
+    parser = CANParser(can_interface=can0, logger=logger, reader=reader, notifier=notifier)
 
     # Main loop to continuously parse CAN messages
+    consecutive_errors = 0
     while True:
         try:
             # Parse messages and get the current values
@@ -55,15 +129,38 @@ try:
             if values:
                 csv_writer.write_values(values)
 
+            consecutive_errors = 0
+
         except can.CanError as e:
             logger.error(f"CAN error: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-            time.sleep(1)  # Prevent tight error loop
+
+            consecutive_errors += 1
+            if consecutive_errors >= CAN_MAX_CONSECUTIVE_ERRORS:
+                logger.error(f"Giving up after {consecutive_errors} consecutive CAN errors")
+                sys.exit(1)
+
+            # Retry straight away after a single error, backing off only if errors repeat
+            if consecutive_errors > 1:
+                time.sleep(min(CAN_ERROR_BACKOFF_S * 2 ** (consecutive_errors - 2), CAN_ERROR_BACKOFF_MAX_S))
+
+            # Restart reception if the error stopped the notifier's receive thread, detaching
+            # the reader first so stopping the old notifier does not also stop the reader
+            if notifier.exception is not None:
+                notifier.remove_listener(reader)
+                notifier.stop()
+                notifier = can.Notifier(can0, [reader])
+                parser.notifier = notifier
 
 except KeyboardInterrupt:
     logger.info("Program terminated by user")
 except Exception as e:
     logger.error(f"Program terminated due to error: {e}")
+    sys.exit(1)
 finally:
+    if notifier is not None:
+        notifier.stop()
+
+    # Let the writer thread finish any pending write before exiting
+    if csv_writer is not None:
+        csv_writer.close()
     logger.info("Program exited")
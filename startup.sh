@@ -1,7 +1,6 @@
 #!/bin/bash
 
 sudo ip link set can0 down
-sudo ip link set can0 type can bitrate 1000000
-sudo ip link set can0 up
+sudo ip link set can0 up type can bitrate 1000000
 
-python3 src/pi-telemetry/receive.py
\ No newline at end of file
+exec "${PYTHON:-python3}" src/pi-telemetry/receive.py
\ No newline at end of file